@@ -0,0 +1,69 @@
+# Chord naming from held MIDI notes. No hardware imports, so it can be
+# tested off the Pi (tests/test_chords.py).
+import functools
+
+PITCH_CLASS_NAMES = ('C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'G#', 'A', 'B-', 'B')  # Flats spelled with '-'
+
+# Intervals above the root for each chord label. A pitch-class set can spell
+# more than one chord (C6 = Am7); the reading rooted on the bass wins,
+# otherwise the earlier entry here.
+CHORD_TEMPLATES = (
+    ('Major', (0, 4, 7)),          ('Minor', (0, 3, 7)),
+    ('Dim', (0, 3, 6)),            ('Aug', (0, 4, 8)),
+    ('7th', (0, 4, 7, 10)),        ('Maj7', (0, 4, 7, 11)),
+    ('Min7', (0, 3, 7, 10)),       ('MinMaj7', (0, 3, 7, 11)),
+    ('Dim7', (0, 3, 6, 9)),        ('m7b5', (0, 3, 6, 10)),
+    ('Aug7', (0, 4, 8, 10)),       ('sus4', (0, 5, 7)),
+    ('sus2', (0, 2, 7)),           ('9th', (0, 2, 4, 7, 10)),
+    ('Maj9', (0, 2, 4, 7, 11)),    ('Min9', (0, 2, 3, 7, 10)),
+    ('6th', (0, 4, 7, 9)),         ('Min6', (0, 3, 7, 9)),
+    ('11th', (0, 2, 4, 5, 7, 10)), ('13th', (0, 2, 4, 7, 9, 10)),
+)
+
+def pitch_class_mask(notes):
+    # 12-bit set of pitch classes, bit n = pitch class n
+    mask = 0
+    for n in notes:
+        mask |= 1 << (n % 12)
+    return mask
+
+def build_chord_table():
+    # (pitch-class mask, bass pitch class) -> (root pitch class, quality)
+    table = {}
+    for quality, intervals in CHORD_TEMPLATES:
+        for root in range(12):
+            pcs = [(root + i) % 12 for i in intervals]
+            mask = pitch_class_mask(pcs)
+            for bass in pcs:
+                current = table.get((mask, bass))
+                if current is None or (bass == root and current[0] != bass):
+                    table[(mask, bass)] = (root, quality)
+    return table
+
+CHORD_TABLE = build_chord_table()
+
+@functools.lru_cache(maxsize=512)
+def detect_chord_cached(mask, bass_pc):
+    # Octave-independent part of detection: (root, quality, is_inversion) or None
+    if not 3 <= bin(mask).count('1') <= 7:
+        # Octave doublings of a dyad, or a cluster: never a named chord
+        return None
+    match = CHORD_TABLE.get((mask, bass_pc))
+    if match is None:
+        return None
+    root_pc, quality = match
+    return PITCH_CLASS_NAMES[root_pc], quality, root_pc != bass_pc
+
+def detect_chord(notes):
+    bass_note = min(notes)
+    bass_pc = bass_note % 12
+    result = detect_chord_cached(pitch_class_mask(notes), bass_pc)
+    if result is None:
+        return "", "", "", "", True
+    root, quality, is_inversion = result
+    if bass_note < 12:
+        bass = PITCH_CLASS_NAMES[bass_pc]  # Lowest octave: name only, as music21 gave it
+    else:
+        bass = f"{PITCH_CLASS_NAMES[bass_pc]}{bass_note // 12 - 1}"  # Plain MIDI octave, no OCTAVE_OFFSET
+    chord_str = f"{root}{quality}/{bass}" if is_inversion else f"{root}{quality}"
+    return chord_str, root, quality, bass, False
@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import array
 import time
 import logging
+import collections
+import functools
 import threading
-from music21 import note as m21note, chord as m21chord
 from mido import get_input_names, open_input
+from inotify_simple import INotify, flags
 from luma.core.interface.serial import i2c
 from luma.oled.device import ssd1306
-from luma.core.render import canvas
-from PIL import ImageFont
+from PIL import Image, ImageDraw, ImageFont
+from chords import PITCH_CLASS_NAMES, pitch_class_mask, detect_chord
 
 # ==== CONFIGURATION ====
 DISPLAY_WIDTH = 128
@@ -21,6 +25,9 @@ DEVICE_SCROLL_START_DELAY = 1
 DEVICE_SCROLL_END_HOLD = 1
 CC_DEBOUNCE_TIME = 0.02
 FLASH_TIME = 0.3
+MAX_FPS = 60  # Upper bound on display redraws per second
+MIDI_QUEUE_SIZE = 1024  # Queued events past which CCs are dropped
+DISPLAY_RT_PRIORITY = 50  # SCHED_FIFO priority for the display thread
 TRIGGER_FILE = "/tmp/midihub_devices.trigger"
 FONT_DIR = os.path.expanduser("~/midihub/fonts")
 OCTAVE_OFFSET = -1  # Adjust octave offset
@@ -30,342 +37,555 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
 
 # ==== FONT LOADING ====
 def load_fonts():
+    # Several roles share a font file; load each file only once
+    files = {
+        'label':      "ter-u14n.pil",
+        'value':      "ter-u14b.pil",
+        'chord_norm': "ter-u14n.pil",
+        'chord_bold': "ter-u14b.pil",
+        'bubble':     "ter-u18b.pil",
+        'device':     "ter-u12n.pil",
+    }
+    loaded = {}
     fonts = {}
-    fonts['label']      = ImageFont.load(os.path.join(FONT_DIR, "ter-u14n.pil"))
-    fonts['value']      = ImageFont.load(os.path.join(FONT_DIR, "ter-u14b.pil"))
-    fonts['chord_norm'] = ImageFont.load(os.path.join(FONT_DIR, "ter-u14n.pil"))
-    fonts['chord_bold'] = ImageFont.load(os.path.join(FONT_DIR, "ter-u14b.pil"))
-    fonts['bubble']     = ImageFont.load(os.path.join(FONT_DIR, "ter-u18b.pil"))
-    fonts['device']     = ImageFont.load(os.path.join(FONT_DIR, "ter-u12n.pil"))
+    for role, filename in files.items():
+        if filename not in loaded:
+            loaded[filename] = ImageFont.load(os.path.join(FONT_DIR, filename))
+        fonts[role] = loaded[filename]
     return fonts
 
 fonts = load_fonts()
 
 # ==== STATE ====
-state = {
-    'channel': None,
-    'cc': None,
-    'cc_val': None,
-    'show_devices': False,
-    'devices': [],
-    'chord_name': '',
-    'chord_root': '',
-    'chord_quality': '',
-    'chord_bass': '',
-    'unknown_chord': False,
-    'last_chord_name': '',
-    'toprow_values_flash_until': {'ch': 0, 'cc': 0, 'val': 0},
-    'last_chord_flash_until': 0,
-    'device_scroll_time': 0,
-    'held_notes': set(),
-    'latched_notes': [],
-    'display_update_event': threading.Event(),
-}
-
-# ==== TRIGGER POLLER ====
-trigger_updated = threading.Event()
-
-def poll_trigger_file(poll_interval=1):
-    last_mtime = None
-    while True:
-        try:
-            mtime = os.path.getmtime(TRIGGER_FILE)
-            if mtime != last_mtime:
-                last_mtime = mtime
-                trigger_updated.set()
-        except FileNotFoundError:
-            pass
-        time.sleep(poll_interval)
+class State:
+    __slots__ = (
+        'channel', 'cc', 'cc_val', 'show_devices', 'devices', 'devices_filtered', 'chord_name',
+        'chord_root', 'chord_quality', 'chord_bass', 'unknown_chord', 'last_chord_name',
+        'toprow_flash', 'last_chord_flash_until', 'device_scroll_time',
+        'held_mask', 'latched_notes', 'display_update_event',
+    )
+
+    def __init__(self):
+        self.channel = None
+        self.cc = None
+        self.cc_val = None
+        self.show_devices = False
+        self.devices = []
+        self.devices_filtered = ()  # Display names, updated with devices
+        self.chord_name = ''
+        self.chord_root = ''
+        self.chord_quality = ''
+        self.chord_bass = ''
+        self.unknown_chord = False
+        self.last_chord_name = ''
+        self.toprow_flash = [0.0, 0.0, 0.0]  # ch, cc, val
+        self.last_chord_flash_until = 0
+        self.device_scroll_time = 0
+        self.held_mask = 0  # Bit n set while MIDI note n is held
+        self.latched_notes = []
+        self.display_update_event = threading.Event()
+
+state = State()
+
+# ==== TRIGGER WATCHER ====
+TRIGGER_NAME = os.path.basename(TRIGGER_FILE)
+
+def open_trigger_watch():
+    # The trigger file may not exist yet, so watch its directory and filter by name
+    inotify = INotify()
+    inotify.add_watch(os.path.dirname(TRIGGER_FILE), flags.CLOSE_WRITE | flags.MOVED_TO)
+    return inotify
+
+def wait_for_trigger(inotify, timeout):
+    # Block up to timeout seconds (None = forever); True if the trigger file was written
+    events = inotify.read(timeout=None if timeout is None else int(timeout * 1000))
+    return any(event.name == TRIGGER_NAME for event in events)
 
 # ==== DEVICE SETUP ====
+class PartialSSD1306(ssd1306):
+    # Sends only the rectangle of pages/columns that changed since the last frame
+    def __init__(self, *args, **kwargs):
+        self._last_pages = None
+        super().__init__(*args, **kwargs)
+
+    def display(self, image):
+        image = self.preprocess(image)
+        # Rotated 90 degrees clockwise, every row of the 1-bit image packs one
+        # display column bottom-to-top, which is the SSD1306 page byte order
+        packed = image.transpose(Image.ROTATE_270).tobytes()
+        n = self._pages
+        pages = [packed[n - 1 - p::n] for p in range(n)]
+        last = self._last_pages
+        self._last_pages = pages
+        if last is None:
+            first, end, col_first, col_end = 0, n - 1, 0, self._w - 1
+        else:
+            changed = [p for p in range(n) if pages[p] != last[p]]
+            if not changed:
+                return
+            first, end = changed[0], changed[-1]
+            # XOR each changed page as one big integer: the highest and lowest
+            # set bits give the first and last differing column
+            width = len(pages[0])
+            col_first, col_end = width, -1
+            for p in changed:
+                diff = int.from_bytes(pages[p], 'big') ^ int.from_bytes(last[p], 'big')
+                col_first = min(col_first, width - 1 - (diff.bit_length() - 1) // 8)
+                col_end = max(col_end, width - 1 - ((diff & -diff).bit_length() - 1) // 8)
+        self.command(
+            self._const.COLUMNADDR, self._colstart + col_first, self._colstart + col_end,
+            self._const.PAGEADDR, first, end)
+        # luma's managed i2c sends this as a single i2c_rdwr transaction (up to
+        # 4 KiB), not 32-byte SMBus blocks; it accepts bytes as-is
+        self.data(b"".join(page[col_first:col_end + 1] for page in pages[first:end + 1]))
+
+# The bus clock is set by the kernel, not here: setup.sh adds
+# dtparam=i2c_arm_baudrate=400000 to config.txt (a full frame takes ~20 ms at 400kHz)
+I2C_CLOCK_FILE = "/sys/class/i2c-adapter/i2c-1/of_node/clock-frequency"
+
+def check_i2c_clock():
+    try:
+        with open(I2C_CLOCK_FILE, 'rb') as f:
+            hz = int.from_bytes(f.read(4), 'big')  # Device tree cell, big-endian u32
+    except OSError:
+        return
+    if hz < 400000:
+        logging.warning(f"I2C bus runs at {hz} Hz; set dtparam=i2c_arm_baudrate=400000 in config.txt for faster display updates")
+
+check_i2c_clock()
 serial = i2c(port=1, address=0x3C)
-device = ssd1306(serial)
+device = PartialSSD1306(serial)
 
 # ==== MIDI & CHORD UTILS ====
+def build_note_names():
+    names = []
+    for midi_note in range(128):
+        octave = midi_note // 12 - 1 + OCTAVE_OFFSET  # Apply offset
+        if midi_note < 12:
+            # Lowest octave has no name (music21 gave it no octave); show the number
+            names.append(str(midi_note))
+        else:
+            names.append(f"{PITCH_CLASS_NAMES[midi_note % 12]}{octave}")
+    return tuple(names)
+
+NOTE_NAMES = build_note_names()
+
+def mask_to_notes(mask):
+    # Set bits of a note bitmask as ascending MIDI note numbers
+    notes = []
+    while mask:
+        low = mask & -mask
+        notes.append(low.bit_length() - 1)
+        mask ^= low
+    return notes
+
 def midi_note_to_name(midi_note):
-    try:
-        n = m21note.Note(midi_note)
-        n.octave += OCTAVE_OFFSET  # Apply offset
-        return n.nameWithOctave
-    except Exception as e:
-        logging.warning(f"Invalid MIDI note {midi_note}: {e}")
-        return str(midi_note)
-
-def detect_chord(notes):
-    try:
-        ch = m21chord.Chord(notes)
-        allowed_types = {
-            'major triad': 'Major',    'minor triad': 'Minor',
-            'diminished triad': 'Dim', 'augmented triad': 'Aug',
-            'dominant seventh chord': '7th', 'major seventh chord': 'Maj7',
-            'minor seventh chord': 'Min7', 'minor-major seventh chord': 'MinMaj7',
-            'diminished seventh chord': 'Dim7', 'half-diminished seventh chord': 'm7b5',
-            'augmented seventh chord': 'Aug7', 'suspended fourth chord': 'sus4',
-            'suspended second chord': 'sus2', 'ninth chord': '9th',
-            'major ninth chord': 'Maj9', 'minor ninth chord': 'Min9',
-            'sixth chord': '6th', 'minor sixth chord': 'Min6',
-            'eleventh chord': '11th', 'thirteenth chord': '13th',
-        }
-        common = ch.commonName
-        root = ch.root().name if ch.root() else ""
-        bass = ch.bass().nameWithOctave if ch.bass() else ""
-        is_inversion = ch.bass() and ch.root() and (ch.bass().name != ch.root().name)
-        if common in allowed_types:
-            quality = allowed_types[common]
-            chord_str = f"{root}{quality}/{bass}" if is_inversion else f"{root}{quality}"
-            return chord_str, root, quality, bass, False
-        return "", "", "", "", True
-    except Exception:
-        return "", "", "", "", True
+    if 0 <= midi_note < 128:
+        return NOTE_NAMES[midi_note]
+    logging.warning(f"Invalid MIDI note {midi_note}")
+    return str(midi_note)
+
+# Base device name: everything before the first ':' or '[', trimmed
+DEVICE_NAME_RE = re.compile(r'\s*([^:\[]*?)\s*(?:[:\[]|$)')
 
 def filter_device_names(devices):
-    filtered = []
-    for name in devices:
-        if "Through" in name:
-            continue
-        base = name.split(":")[0].strip()
-        base = base.split("[")[0].strip()
-        filtered.append(base)
-    return filtered
+    match = DEVICE_NAME_RE.match
+    return [match(name).group(1) for name in devices if "Through" not in name]
 
 # ==== DISPLAY UTILS ====
+_last_toprow_state = None
+_last_toprow_pixels = None
+
+text_size_cache = {}
+
 def get_text_size(text, font):
-    bbox = font.getbbox(text)
-    return (bbox[2] - bbox[0], bbox[3] - bbox[1])
+    key = (id(font), text)
+    size = text_size_cache.get(key)
+    if size is None:
+        bbox = font.getbbox(text)
+        size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+        text_size_cache[key] = size
+    return size
+
+def preload_text_sizes():
+    # Top-row labels and every value it can show ('-' and 0..127)
+    for text in ['CH', 'CC', 'VAL', '-'] + [str(v) for v in range(128)]:
+        get_text_size(text, fonts['label'])
+        get_text_size(text, fonts['value'])
+    for name in NOTE_NAMES:
+        get_text_size(name, fonts['bubble'])
+
+preload_text_sizes()
+DASH_SIZE = get_text_size("--", fonts['bubble'])
+NOTE_BUBBLE_SIZES = tuple(get_text_size(name, fonts['bubble']) for name in NOTE_NAMES)
+
+# Layout depends only on the fonts, so it is fixed at import
+CHORD_TEXT_H = get_text_size("A", fonts['chord_norm'])[1]
+CHORD_FIXED_Y = DISPLAY_HEIGHT - CHORD_TEXT_H
+TOPLINE_H = max(get_text_size(label, fonts['label'])[1] for label in ["CH", "CC", "VAL"])
+TOPLINE_Y = 0
+BUBBLE_REGION_Y = TOPLINE_Y + TOPLINE_H + 2
+BUBBLE_REGION_H = max(0, CHORD_FIXED_Y - 2 - BUBBLE_REGION_Y)
+DEVICE_LINE_H = get_text_size("A", fonts['device'])[1] + 2
+DEVICE_SCROLL_PERIOD = DEVICE_DISPLAY_TIME - DEVICE_SCROLL_START_DELAY - DEVICE_SCROLL_END_HOLD
+DASH_POS = ((DISPLAY_WIDTH - DASH_SIZE[0]) // 2, BUBBLE_REGION_Y + (BUBBLE_REGION_H - DASH_SIZE[1]) // 2)
+
+def render_dash():
+    # The "--" shown with no notes never changes; rasterize it once.
+    # Sized to the glyph extent from the text origin so the paste matches draw.text
+    font = fonts['bubble']
+    _, _, right, bottom = font.getbbox("--")
+    image = Image.new(device.mode, (right, bottom))
+    ImageDraw.Draw(image).text((0, 0), "--", font=font, fill=128)
+    return image
+
+DASH_SPRITE = render_dash()
 
 def draw_centered_text(draw, x, y, w, h, text, font, fill):
     text_w, text_h = get_text_size(text, font)
     text_y = y + (h - text_h) // 2
     draw.text((x + (w - text_w) // 2, text_y), text, font=font, fill=fill)
 
-def draw_toprow(draw, y, state):
-    ch = str(state['channel']) if state['channel'] is not None else '-'
-    cc = str(state['cc']) if state['cc'] is not None else '-'
-    val = str(state['cc_val']) if state['cc_val'] is not None else '-'
+def render_toprow(values, flashes):
     label_font = fonts['label']
     value_bold_font = fonts['value']
     value_normal_font = fonts['label']  # Use normal as the "flash" state
     labels = ['CH', 'CC', 'VAL']
-    values = [ch, cc, val]
-    flash_until = state['toprow_values_flash_until']
     padd = 2
     sep = 2
 
-    heights = []
-    for label, value in zip(labels, values):
-        lw, lh = get_text_size(label, label_font)
-        vw, vh = get_text_size(value, value_bold_font)
-        heights.extend([lh, vh])
-    maxh = max(heights)
-    baseline_y = y
-
+    maxh = 0
+    baseline_y = 0
     parts = []
     for label, value in zip(labels, values):
         lw, lh = get_text_size(label, label_font)
         vw, vh = get_text_size(value, value_bold_font)
+        maxh = max(maxh, lh, vh)
         parts.append((label, lw, lh, value, vw, vh))
     total_w = sum(lw + padd + vw for _, lw, _, _, vw, _ in parts) + sep * (len(parts) - 1)
     x = (DISPLAY_WIDTH - total_w) // 2
-    now = time.time()
 
+    image = Image.new(device.mode, (DISPLAY_WIDTH, maxh))
+    draw = ImageDraw.Draw(image)
     for i, (label, lw, lh, value, vw, vh) in enumerate(parts):
         label_y = baseline_y + (maxh - lh) // 2
         draw.text((x, label_y), label, font=label_font, fill=255)
         x += lw + padd
-        is_flash = now < flash_until.get(['ch', 'cc', 'val'][i], 0)
-        font_to_use = value_normal_font if is_flash else value_bold_font
+        font_to_use = value_normal_font if flashes[i] else value_bold_font
         draw_centered_text(draw, x, baseline_y, vw, maxh, value, font_to_use, fill=255)
         x += vw + sep
+    return image
+
+def draw_toprow(image, y, state, now):
+    global _last_toprow_state, _last_toprow_pixels
+    ch = str(state.channel) if state.channel is not None else '-'
+    cc = str(state.cc) if state.cc is not None else '-'
+    val = str(state.cc_val) if state.cc_val is not None else '-'
+    flash_until = state.toprow_flash
+    flashes = (now < flash_until[0], now < flash_until[1], now < flash_until[2])
+    key = (ch, cc, val, flashes)
+    # Re-render only when a value or flash state changed; otherwise blit the cached row
+    if key != _last_toprow_state:
+        _last_toprow_pixels = render_toprow((ch, cc, val), flashes)
+        _last_toprow_state = key
+    image.paste(_last_toprow_pixels, (0, y))
+
+# Rendered bubbles keyed by (note, invert, bubble_h); at most 2 * 128 per height
+bubble_sprites = {}
 
-def draw_bubble_notes(draw, region_y, bubbles, font, region_height):
+def get_bubble_sprite(note, name, invert, bw, bubble_h, font):
+    key = (note, invert, bubble_h)
+    sprite = bubble_sprites.get(key)
+    if sprite is None:
+        text_w, text_h = NOTE_BUBBLE_SIZES[note]
+        sprite = Image.new(device.mode, (bw + 1, bubble_h + 1))
+        draw = ImageDraw.Draw(sprite)
+        draw.rounded_rectangle((0, 0, bw, bubble_h), radius=5, outline=255, fill=255 if invert else 0)
+        draw.text(((bw - text_w) // 2, (bubble_h - text_h) // 2), name, font=font, fill=0 if invert else 255)
+        bubble_sprites[key] = sprite
+    return sprite
+
+def layout_bubble_notes(region_y, bubbles, font, region_height):
+    # Sprite and position for each bubble; only depends on the notes, so it is
+    # computed when they change and pasted as-is on every other redraw
     padd_x = 2
     padd_y = 2
     spacing = 3
     if not bubbles:
-        return
-    text_heights = [get_text_size(b['name'], font)[1] for b in bubbles]
-    text_height = max(text_heights)
-    bubble_h = text_height + padd_y * 2
-    bubble_w = [get_text_size(b['name'], font)[0] + 2 * padd_x for b in bubbles]
-    total_w = sum(bubble_w) + spacing * (len(bubbles) - 1)
+        return []
+    sizes = [NOTE_BUBBLE_SIZES[b['note']] for b in bubbles]
+    bubble_h = max(text_h for _, text_h in sizes) + padd_y * 2
+    total_w = sum(text_w for text_w, _ in sizes) + 2 * padd_x * len(bubbles) + spacing * (len(bubbles) - 1)
     x = (DISPLAY_WIDTH - total_w) // 2 if total_w <= DISPLAY_WIDTH else -((total_w - DISPLAY_WIDTH) // 2)
     y_centered = region_y + (region_height - bubble_h) // 2
-    for i, b in enumerate(bubbles):
-        bw = bubble_w[i]
-        invert = b['invert']
-        draw.rounded_rectangle((x, y_centered, x + bw, y_centered + bubble_h), radius=5, outline=255, fill=255 if invert else 0)
-        draw_centered_text(draw, x, y_centered, bw, bubble_h, b['name'], font, fill=0 if invert else 255)
+    layout = []
+    for b, (text_w, _) in zip(bubbles, sizes):
+        bw = text_w + 2 * padd_x
+        layout.append((get_bubble_sprite(b['note'], b['name'], b['invert'], bw, bubble_h, font), (x, y_centered)))
         x += bw + spacing
+    return layout
+
+@functools.lru_cache(maxsize=64)
+def render_chord_text(text, bold):
+    # Chord names repeat constantly while playing; rasterize each once
+    font = fonts['chord_bold'] if bold else fonts['chord_norm']
+    image = Image.new(device.mode, get_text_size(text, font))
+    ImageDraw.Draw(image).text((0, 0), text, font=font, fill=255)
+    return image
+
+def render_device_list(devices):
+    image = Image.new(device.mode, (DISPLAY_WIDTH, max(1, DEVICE_LINE_H * len(devices))))
+    draw = ImageDraw.Draw(image)
+    for i, name in enumerate(devices):
+        draw.text((0, i * DEVICE_LINE_H), name, font=fonts['device'], fill=255)
+    return image
 
 # ==== MAIN DISPLAY LOOP ====
+def display_timeout(now):
+    # Event-driven by default; only wake on a timer while the device list may
+    # be scrolling or a flash is still to expire
+    if state.show_devices:
+        return 0.04
+    pending = [t for t in state.toprow_flash if t > now]
+    if state.last_chord_flash_until > now:
+        pending.append(state.last_chord_flash_until)
+    return min(pending) - now if pending else None
+
+def set_realtime_priority():
+    # Run the calling thread under SCHED_FIFO. The display thread applies the
+    # MIDI events and draws them, so it is the one that must not wait behind
+    # SCHED_OTHER work; the port callbacks only queue events.
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(DISPLAY_RT_PRIORITY))
+        logging.info(f"Display thread running with SCHED_FIFO priority {DISPLAY_RT_PRIORITY}")
+    except (AttributeError, OSError) as e:
+        logging.warning(f"Could not set realtime priority, using default scheduler: {e}")
+
 def update_display():
-    chord_font = fonts['chord_norm']
-    chord_bold_font = fonts['chord_bold']
-    chord_text_h = get_text_size("A", chord_font)[1]
-    chord_fixed_y = DISPLAY_HEIGHT - chord_text_h
-    topline_h = max(get_text_size(label, fonts['label'])[1] for label in ["CH", "CC", "VAL"])
-    topline_y = 0
-
-    def get_bubbles_region():
-        top = topline_y + topline_h + 2
-        bottom = chord_fixed_y - 2
-        return top, max(0, bottom - top)
+    last_chord_key = None
+    last_chord_result = None
+    last_render = 0
+    last_frame_sig = None
+    chord_notes = ()
+    chord_key = None
+    bubble_layout = []
+    notes_sig = ((), ())
+    framebuffer = Image.new(device.mode, device.size)
+    device_list_devices = None
+    device_list_image = None
+    draw = ImageDraw.Draw(framebuffer)
+    set_realtime_priority()
+    # Draw the idle screen at startup; without a MIDI device nothing else wakes us
+    state.display_update_event.set()
 
     while True:
-        event_triggered = state['display_update_event'].wait(timeout=0.04)
-        state['display_update_event'].clear()
-
-        now = time.time()
-        held = set(state['held_notes'])
-        latched = [n for n in state['latched_notes'] if n not in held]
-        all_bubbles = sorted(list(held) + latched)[:MAX_BUBBLES]
-        display_bubbles = [{'note': n, 'name': midi_note_to_name(n), 'invert': n in held} for n in all_bubbles]
-
-        with canvas(device) as draw:
-            if state['show_devices']:
-                devices = filter_device_names(state['devices'])
-                font = fonts['device']
-                line_h = get_text_size("A", font)[1] + 2
-                n_devices = len(devices)
-                if n_devices <= MAX_DEVICE_LINES:
-                    for i, name in enumerate(devices):
-                        y = i * line_h
-                        if y < DISPLAY_HEIGHT:
-                            draw.text((0, y), name, font=font, fill=255)
+        state.display_update_event.wait(timeout=display_timeout(time.monotonic()))
+        # Coalesce bursts of MIDI events into at most MAX_FPS redraws
+        now = time.monotonic()
+        delta = now - last_render
+        if delta < 1 / MAX_FPS:
+            time.sleep(1 / MAX_FPS - delta)
+            now = time.monotonic()
+        state.display_update_event.clear()
+        last_render = now
+        # Notes only change when events are applied; otherwise reuse last frame's lists
+        if midi_events:
+            while midi_events:
+                event = midi_events.popleft()
+                # Encoder/fader bursts: a CC followed by another value for the
+                # same channel and controller would be overwritten unseen
+                if event[0] == 'cc' and midi_events and midi_events[0][:3] == event[:3]:
+                    continue
+                apply_midi_event(event)
+            held_mask = state.held_mask
+            held_sorted = mask_to_notes(held_mask)
+            all_bubbles = tuple(sorted(held_sorted + state.latched_notes)[:MAX_BUBBLES])
+            # CC-only batches leave the notes alone; keep the previous layout
+            if (all_bubbles, held_mask) != notes_sig:
+                bubbles = [{'note': n, 'name': midi_note_to_name(n), 'invert': bool(held_mask >> n & 1)} for n in all_bubbles]
+                bubble_layout = layout_bubble_notes(BUBBLE_REGION_Y, bubbles, fonts['bubble'], BUBBLE_REGION_H)
+                chord_notes = tuple(held_sorted[:MAX_BUBBLES])  # Already sorted and unique
+                # Chord name depends only on the pitch classes and the bass note
+                chord_key = (pitch_class_mask(chord_notes), chord_notes[0]) if chord_notes else None
+                notes_sig = (all_bubbles, held_mask)
+
+        show_devices = state.show_devices
+        if show_devices:
+            devices = state.devices_filtered
+            n_devices = len(devices)
+            pixel_offset = 0
+            if n_devices > MAX_DEVICE_LINES:
+                max_pixel_offset = max(0, DEVICE_LINE_H * n_devices - DISPLAY_HEIGHT)
+                elapsed = now - state.device_scroll_time
+                if elapsed >= DEVICE_SCROLL_START_DELAY + DEVICE_SCROLL_PERIOD:
+                    pixel_offset = max_pixel_offset
+                elif elapsed > DEVICE_SCROLL_START_DELAY:
+                    scroll_elapsed = elapsed - DEVICE_SCROLL_START_DELAY
+                    pixel_offset = int((scroll_elapsed / DEVICE_SCROLL_PERIOD) * max_pixel_offset)
+            frame_sig = (True, devices, pixel_offset)
+        else:
+            chord_to_display = ""
+            chord_invert = (now < state.last_chord_flash_until)
+            if chord_notes and len(chord_notes) >= 3:
+                # Same pitch classes over the same bass (e.g. an added octave
+                # doubling): reuse the previous result
+                if chord_key != last_chord_key:
+                    last_chord_result = detect_chord(chord_notes)
+                    last_chord_key = chord_key
+                chord_str, root, quality, bass, unknown = last_chord_result
+                if not unknown and chord_str:
+                    state.chord_name = chord_str
+                    state.chord_root = root
+                    state.chord_quality = quality
+                    state.chord_bass = bass
+                    state.unknown_chord = False
+                    state.last_chord_name = chord_str
+                    chord_to_display = chord_str
                 else:
-                    list_height = line_h * n_devices
-                    max_pixel_offset = max(0, list_height - DISPLAY_HEIGHT)
-                    scroll_period = DEVICE_DISPLAY_TIME - DEVICE_SCROLL_START_DELAY - DEVICE_SCROLL_END_HOLD
-                    elapsed = now - state['device_scroll_time']
-                    if elapsed < DEVICE_SCROLL_START_DELAY:
-                        pixel_offset = 0
-                    elif elapsed >= DEVICE_SCROLL_START_DELAY + scroll_period:
-                        pixel_offset = max_pixel_offset
-                    else:
-                        scroll_elapsed = elapsed - DEVICE_SCROLL_START_DELAY
-                        pixel_offset = int((scroll_elapsed / scroll_period) * max_pixel_offset)
-                    for i in range(n_devices):
-                        y = i * line_h - pixel_offset
-                        if -line_h < y < DISPLAY_HEIGHT:
-                            draw.text((0, y), devices[i], font=font, fill=255)
+                    chord_to_display = state.last_chord_name
+                    state.chord_name = chord_to_display
+                    state.unknown_chord = True
             else:
-                draw_toprow(draw, topline_y, state)
-                bubble_font = fonts['bubble']
-                region_y, region_h = get_bubbles_region()
-                if display_bubbles:
-                    draw_bubble_notes(draw, region_y, display_bubbles, font=bubble_font, region_height=region_h)
-                else:
-                    dash_w, dash_h = get_text_size("--", bubble_font)
-                    dash_x = (DISPLAY_WIDTH - dash_w) // 2
-                    dash_y = region_y + (region_h - dash_h) // 2
-                    draw.text((dash_x, dash_y), "--", font=bubble_font, fill=128)
-                chord_notes = sorted(list(held))[:MAX_BUBBLES]
-                chord_to_display = ""
-                chord_invert = (now < state['last_chord_flash_until'])
-                if chord_notes and len(chord_notes) >= 3:
-                    chord_str, root, quality, bass, unknown = detect_chord(chord_notes)
-                    if not unknown and chord_str:
-                        state['chord_name'] = chord_str
-                        state['chord_root'] = root
-                        state['chord_quality'] = quality
-                        state['chord_bass'] = bass
-                        state['unknown_chord'] = False
-                        state['last_chord_name'] = chord_str
-                        chord_to_display = chord_str
-                    else:
-                        chord_to_display = state['last_chord_name']
-                        state['chord_name'] = chord_to_display
-                        state['unknown_chord'] = True
-                else:
-                    chord_to_display = state['last_chord_name']
+                chord_to_display = state.last_chord_name
+            flashes = tuple(now < f for f in state.toprow_flash)
+            frame_sig = (False, state.channel, state.cc, state.cc_val, notes_sig,
+                         flashes, chord_to_display, chord_invert)
+
+        # Nothing visible changed: skip drawing and the full-frame I2C flush
+        if frame_sig == last_frame_sig:
+            continue
+        last_frame_sig = frame_sig
 
-                w, h = get_text_size(chord_to_display, chord_font)
-                chord_x = (DISPLAY_WIDTH - w) // 2
-                if chord_to_display:
-                    font_to_use = chord_bold_font if chord_invert else chord_font
-                    draw_centered_text(draw, chord_x, chord_fixed_y, w, h, chord_to_display, font_to_use, fill=255)
+        # Redraw into the persistent framebuffer; the device only sends what changed
+        draw.rectangle((0, 0, DISPLAY_WIDTH - 1, DISPLAY_HEIGHT - 1), fill=0)
+        if show_devices:
+            # Rasterize the list once per device change; scrolling just moves the paste
+            if devices != device_list_devices:
+                device_list_image = render_device_list(devices)
+                device_list_devices = devices
+            framebuffer.paste(device_list_image, (0, -pixel_offset))
+        else:
+            draw_toprow(framebuffer, TOPLINE_Y, state, now)
+            if bubble_layout:
+                for sprite, pos in bubble_layout:
+                    framebuffer.paste(sprite, pos)
+            else:
+                framebuffer.paste(DASH_SPRITE, DASH_POS)
+
+            if chord_to_display:
+                w, h = get_text_size(chord_to_display, fonts['chord_norm'])
+                sprite = render_chord_text(chord_to_display, chord_invert)
+                text_w, text_h = sprite.size
+                chord_pos = ((DISPLAY_WIDTH - w) // 2 + (w - text_w) // 2, CHORD_FIXED_Y + (h - text_h) // 2)
+                framebuffer.paste(sprite, chord_pos)
+        device.display(framebuffer)
 
 # ==== MIDI HANDLING ====
+# Filled by mido's per-port callback threads, drained by the display thread,
+# which is the only one that touches the note/CC state. Unbounded so a
+# note_off is never evicted (that would leave the note held for good);
+# only CCs are shed once MIDI_QUEUE_SIZE events are waiting.
+midi_events = collections.deque()
+cc_timestamps = array.array('d', [0.0] * 128)  # Last accepted time per CC number
+
 def debounce_cc_event(cc_number, now, cc_timestamps, debounce_time=CC_DEBOUNCE_TIME):
-    last = cc_timestamps.get(cc_number, 0)
+    last = cc_timestamps[cc_number]
     if now - last > debounce_time:
         cc_timestamps[cc_number] = now
         return True
     return False
 
+def handle_midi_message(msg):
+    # Read msg.type once; running-status note_on with velocity 0 is a note_off
+    msg_type = msg.type
+    if msg_type == 'note_on':
+        velocity = msg.velocity
+        kind = 'note_on' if velocity else 'note_off'
+        event = (kind, msg.channel + 1, msg.note, velocity, time.monotonic())
+    elif msg_type == 'note_off':
+        event = ('note_off', msg.channel + 1, msg.note, 0, time.monotonic())
+    elif msg_type == 'control_change':
+        if len(midi_events) >= MIDI_QUEUE_SIZE:
+            return  # Display is behind: shed CCs, never notes
+        event = ('cc', msg.channel + 1, msg.control, msg.value, time.monotonic())
+    else:
+        return
+    midi_events.append(event)
+    state.display_update_event.set()
+
+def apply_midi_event(event):
+    kind, channel, number, value, now = event
+    prev_ch = state.channel
+    if kind == 'note_on':
+        state.channel = channel
+        if state.latched_notes:
+            state.latched_notes.clear()
+        state.held_mask |= 1 << number
+    elif kind == 'note_off':
+        state.channel = channel
+        bit = 1 << number
+        if state.held_mask & bit:
+            state.held_mask &= ~bit
+            # Latched notes are always released ones, so they never overlap held notes
+            if number not in state.latched_notes:
+                state.latched_notes.append(number)
+                # With more than MAX_BUBBLES notes still held, drop every latched note but no more
+                while state.latched_notes and bin(state.held_mask).count('1') + len(state.latched_notes) > MAX_BUBBLES:
+                    state.latched_notes.pop(0)
+    elif kind == 'cc':
+        if debounce_cc_event(number, now, cc_timestamps):
+            state.channel = channel
+            if state.cc != number:
+                state.toprow_flash[1] = now + FLASH_TIME
+            if state.cc_val != value:
+                state.toprow_flash[2] = now + FLASH_TIME
+            state.cc = number
+            state.cc_val = value
+    if prev_ch != state.channel:
+        state.toprow_flash[0] = now + FLASH_TIME
+
 def monitor_midi():
     inputs = []
     last_device_list = []
     shown_at = None
-    prev_ch = None
-    cc_timestamps = {}
+    inotify = open_trigger_watch()
+    triggered = True
 
+    # MIDI messages arrive via handle_midi_message callbacks; this loop only
+    # tracks device changes and the device screen timeout.
     while True:
-        # Device polling (1Hz, signaled by trigger_updated event)
-        if trigger_updated.is_set() or not inputs:
-            trigger_updated.clear()
+        now = time.monotonic()
+        # Device refresh, signaled by a write to the trigger file
+        if triggered or not inputs:
             current_devices = get_input_names()
             filtered_devices = filter_device_names(current_devices)
             if filtered_devices != last_device_list:
                 last_device_list = list(filtered_devices)
-                state['devices'] = current_devices
-                state['show_devices'] = True
+                state.devices = current_devices
+                state.devices_filtered = tuple(filtered_devices)
+                state.show_devices = True
                 for inp in inputs:
                     inp.close()
-                inputs = [open_input(name) for name in current_devices if "Through" not in name]
-                shown_at = time.time()
-                state['device_scroll_time'] = shown_at
-        if state['show_devices']:
-            if shown_at and (time.time() - shown_at > DEVICE_DISPLAY_TIME):
-                state['show_devices'] = False
-                state['display_update_event'].set()
-
-        now = time.time()
-        midi_event = False
-        for port in inputs:
-            for msg in port.iter_pending():
-                if msg.type == 'note_on' and msg.velocity > 0:
-                    state['channel'] = msg.channel + 1
-                    if state['latched_notes']:
-                        state['latched_notes'].clear()
-                    state['held_notes'].add(msg.note)
-                    while len(state['held_notes']) + len([n for n in state['latched_notes'] if n not in state['held_notes']]) > MAX_BUBBLES:
-                        if state['latched_notes']:
-                            state['latched_notes'].pop(0)
-                        else:
-                            break
-                    midi_event = True
-                elif (msg.type == 'note_off') or (msg.type == 'note_on' and msg.velocity == 0):
-                    state['channel'] = msg.channel + 1
-                    if msg.note in state['held_notes']:
-                        state['held_notes'].remove(msg.note)
-                        if msg.note not in state['latched_notes']:
-                            state['latched_notes'].append(msg.note)
-                            while len(state['held_notes']) + len([n for n in state['latched_notes'] if n not in state['held_notes']]) > MAX_BUBBLES:
-                                state['latched_notes'].pop(0)
-                        midi_event = True
-                elif msg.type == 'control_change':
-                    if debounce_cc_event(msg.control, now, cc_timestamps):
-                        state['channel'] = msg.channel + 1
-                        if state['cc'] != msg.control:
-                            state['toprow_values_flash_until']['cc'] = now + FLASH_TIME
-                        if state['cc_val'] != msg.value:
-                            state['toprow_values_flash_until']['val'] = now + FLASH_TIME
-                        state['cc'] = msg.control
-                        state['cc_val'] = msg.value
-                        midi_event = True
-        if prev_ch != state['channel']:
-            state['toprow_values_flash_until']['ch'] = now + FLASH_TIME
-        prev_ch = state['channel']
-
-        if midi_event:
-            state['display_update_event'].set()
-        time.sleep(0.005)
+                inputs = [open_input(name, callback=handle_midi_message) for name in current_devices if "Through" not in name]
+                shown_at = now
+                state.device_scroll_time = shown_at
+                state.display_update_event.set()
+        if state.show_devices:
+            if shown_at and (now - shown_at > DEVICE_DISPLAY_TIME):
+                state.show_devices = False
+                state.display_update_event.set()
+        # Block on the trigger file watch; only wake early to close the
+        # device screen or to retry while no inputs are open
+        if state.show_devices and shown_at:
+            timeout = max(0.05, shown_at + DEVICE_DISPLAY_TIME - now)
+        elif not inputs:
+            timeout = 1
+        else:
+            timeout = None
+        triggered = wait_for_trigger(inotify, timeout)
 
 # ==== MAIN ENTRY POINT ====
 if __name__ == "__main__":
-    poller_thread = threading.Thread(target=poll_trigger_file, daemon=True)
-    poller_thread.start()
     display_thread = threading.Thread(target=update_display, daemon=True)
     midi_thread = threading.Thread(target=monitor_midi, daemon=True)
     display_thread.start()
@@ -17,6 +17,14 @@ echo "==> Enabling i2c and UART pins..."
 sudo raspi-config nonint do_i2c 0
 sudo raspi-config nonint do_serial 1
 
+# ==== i2C FAST MODE ====
+echo "==> Setting i2c bus speed to 400kHz for the OLED..."
+CONFIG_TXT="/boot/firmware/config.txt"
+[ -f "$CONFIG_TXT" ] || CONFIG_TXT="/boot/config.txt"
+if ! grep -q '^dtparam=i2c_arm_baudrate=' "$CONFIG_TXT"; then
+    echo "dtparam=i2c_arm_baudrate=400000" | sudo tee -a "$CONFIG_TXT" > /dev/null
+fi
+
 # ==== CREATE VENV ====
 echo "==> Creating Python virtual environment..."
 python3 -m venv "$VENV_DIR"
@@ -0,0 +1,60 @@
+import unittest
+
+from chords import CHORD_TEMPLATES, PITCH_CLASS_NAMES, detect_chord
+
+C3 = 48  # MIDI note of C3
+
+
+class ChordTemplateTest(unittest.TestCase):
+    def test_every_template_in_root_position(self):
+        for quality, intervals in CHORD_TEMPLATES:
+            for root in range(12):
+                notes = tuple(C3 + root + i for i in intervals)
+                name = PITCH_CLASS_NAMES[root]
+                with self.subTest(quality=quality, root=name):
+                    bass = f"{name}{notes[0] // 12 - 1}"
+                    self.assertEqual(detect_chord(notes), (f"{name}{quality}", name, quality, bass, False))
+
+    def test_octave_doublings_do_not_change_the_name(self):
+        self.assertEqual(detect_chord((48, 52, 55, 60, 64))[0], "CMajor")
+
+    def test_fewer_than_three_pitch_classes_is_unknown(self):
+        self.assertTrue(detect_chord((48, 55, 60))[4])
+
+    def test_unlisted_set_is_unknown(self):
+        self.assertTrue(detect_chord((48, 49, 50))[4])
+
+
+class ChordTieBreakTest(unittest.TestCase):
+    # Sets that spell more than one chord: the reading rooted on the bass
+    # wins, otherwise the earlier CHORD_TEMPLATES entry
+
+    def test_sixth_versus_minor_seventh(self):
+        self.assertEqual(detect_chord((48, 57, 64, 67))[0], "C6th")    # C A E G
+        self.assertEqual(detect_chord((45, 48, 52, 55))[0], "AMin7")   # A C E G
+        self.assertEqual(detect_chord((52, 57, 60, 67))[0], "AMin7/E3")
+
+    def test_minor_sixth_versus_half_diminished(self):
+        self.assertEqual(detect_chord((48, 51, 55, 57))[0], "CMin6")   # C Eb G A
+        self.assertEqual(detect_chord((45, 48, 51, 55))[0], "Am7b5")   # A C Eb G
+
+    def test_diminished_seventh_is_rooted_on_the_bass(self):
+        for bass in (48, 51, 54, 57):                                  # C Eb Gb A
+            notes = tuple(sorted({bass} | {n + 12 for n in (48, 51, 54, 57) if n != bass}))
+            name = PITCH_CLASS_NAMES[bass % 12]
+            self.assertEqual(detect_chord(notes)[0], f"{name}Dim7")
+
+    def test_augmented_is_rooted_on_the_bass(self):
+        for bass in (48, 52, 56):                                      # C E G#
+            notes = tuple(sorted({bass} | {n + 12 for n in (48, 52, 56) if n != bass}))
+            name = PITCH_CLASS_NAMES[bass % 12]
+            self.assertEqual(detect_chord(notes)[0], f"{name}Aug")
+
+    def test_sus2_versus_sus4(self):
+        self.assertEqual(detect_chord((48, 50, 55))[0], "Csus2")       # C D G
+        self.assertEqual(detect_chord((43, 48, 50))[0], "Gsus4")       # G C D
+        self.assertEqual(detect_chord((50, 55, 60))[0], "Gsus4/D3")    # D G C: sus4 listed first
+
+
+if __name__ == "__main__":
+    unittest.main()